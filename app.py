@@ -5,14 +5,28 @@ Run this file directly: python app.py
 """
 
 import os
-import json
-import uuid
+import re
+import copy
+import secrets
+import shelve
+import sqlite3
+import asyncio
+import atexit
+import hashlib
+import time
+import threading
+import contextlib
+from dataclasses import asdict, dataclass
 from datetime import datetime
-from typing import List, Dict
-import gradio as gr
-from openai import OpenAI
+from typing import TYPE_CHECKING, List, Dict, Optional, Tuple
+import jinja2
+import orjson
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_random_exponential
 from dotenv import load_dotenv
 
+if TYPE_CHECKING:
+    import numpy as np
+
 # Load environment variables
 load_dotenv()
 
@@ -24,128 +38,752 @@ if not OPENAI_API_KEY:
     print("Please set it in .env file or as environment variable")
     print("Example: export OPENAI_API_KEY='sk-proj-...'")
 
-client = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
+# gpt-4o-mini by default; OPENAI_MODEL must support Structured Outputs (json_schema), e.g. gpt-4o
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+MAX_COMPLETION_TOKENS = 1200
+
+# Structured Outputs schema for the task list
+_TASK_FIELDS = ("name", "description", "duration", "dependencies", "priority", "deliverables", "risks")
+_TASK_LIST_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            **{field: {"type": "string"} for field in _TASK_FIELDS},
+            "priority": {"type": "string", "enum": ["High", "Medium", "Low"]}
+        },
+        "required": list(_TASK_FIELDS),
+        "additionalProperties": False
+    }
+}
+TASKS_SCHEMA = {
+    "name": "task_plan",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {"tasks": _TASK_LIST_SCHEMA},
+        "required": ["tasks"],
+        "additionalProperties": False
+    }
+}
+BATCH_SCHEMA = {
+    "name": "task_plans",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "plans": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {"goal_id": {"type": "integer"}, "tasks": _TASK_LIST_SCHEMA},
+                    "required": ["goal_id", "tasks"],
+                    "additionalProperties": False
+                }
+            }
+        },
+        "required": ["plans"],
+        "additionalProperties": False
+    }
+}
+
+# Goals packed into one completion by generate_plans_batch
+BATCH_SIZE = 8
+
+# Generated plans (SQLite, indexed on goal and created_at)
+PLANS_DB = os.getenv("PLANS_DB", "plans.db")
+
+# Cap in-flight OpenAI calls to stay clear of 429s
+MAX_CONCURRENT_REQUESTS = 10
+
+# 429s, dropped connections and 5xx are retried with jittered exponential backoff
+def _is_retryable(exc: BaseException) -> bool:
+    import openai
+    # APITimeoutError subclasses APIConnectionError; a 600s read timeout is not worth repeating
+    if isinstance(exc, openai.APITimeoutError):
+        return False
+    return isinstance(exc, (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError))
+
+_api_retry = retry(
+    wait=wait_random_exponential(min=1, max=20),
+    stop=stop_after_attempt(5),
+    retry=retry_if_exception(_is_retryable),
+    reraise=True
+)
+
+_RESET_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_RESET_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+# LLM response cache (survives restarts)
+CACHE_DIR = os.getenv("PLANNER_CACHE_DIR", ".llm_cache")
+
+# Goal templating: quoted entities and capitalized names become slots. Numbers stay literal
+# in the template, since counts and spans ("2 blog posts", "in 3 weeks") shape the plan itself
+_SLOT_RE = re.compile(
+    r'"([^"]+)"'
+    r"|'([^']+)'"
+    r"|(?<!^)(?<![.!?] )\b([A-Z][\w+#]*(?:[.-]\w+)*(?:\s+[A-Z][\w+#]*(?:[.-]\w+)*)*)"
+)
+_TIMEFRAME_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(hour|day|week|month|year)", re.I)
+_TIMEFRAME_DAYS = {"hour": 1 / 8, "day": 1, "week": 7, "month": 30, "year": 365}
+_TEMPLATED_FIELDS = ("name", "description", "dependencies", "deliverables", "risks")
+
+# Field defaults for tasks missing from the LLM response ("id" first keeps key order)
+_TASK_DEFAULTS = {
+    "id": 0,
+    "name": "Task",
+    "description": "No description",
+    "duration": "1 day",
+    "dependencies": "None",
+    "priority": "Medium",
+    "deliverables": "Task completion",
+    "risks": "None identified",
+    "status": "pending"
+}
+
+# Task duration parsing (8-hour days, 40-hour weeks, 4-week months), keyed by the unit's first
+# two letters so minute and month stay distinct; one qualifier word is allowed ("3 business days")
+_DUR_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(?:\w+\s+)?(minute|hour|day|week|month)", re.I)
+_MULT = {"mi": 1 / 60, "ho": 1, "da": 8, "we": 40, "mo": 160}
+
+# Plan display, keyed by the priority's first letter
+_PRIORITY_ICON = {"H": "🔴", "M": "🟡", "L": "🟢"}
+
+# Plan markdown, compiled once
+_ENV = jinja2.Environment(autoescape=False, trim_blocks=True)
+_PLAN_TPL = _ENV.from_string("""# 🎯 Task Plan
+
+**ID**: {{ plan.id }}  
+**Goal**: {{ plan.goal }}  
+**Timeframe**: {{ plan.timeframe }}  
+**Tasks**: {{ plan.total_tasks }}  
+
+---
+
+{% for t in plan.tasks %}
+## {{ t.id }}. {{ t.name }} {{ icons.get(t.priority[:1], "⚪") }}
+
+{{ t.description }}
+
+⏱️ **Duration**: {{ t.duration }}  
+🔗 **Dependencies**: {{ t.dependencies }}  
+📦 **Deliverables**: {{ t.deliverables }}  
+⚠️ **Risks**: {{ t.risks }}
+
+---
+
+{% endfor %}
+""")
+
+# Semantic cache for near-duplicate goals
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIM = 1536
+SEMANTIC_CACHE_THRESHOLD = 0.92
+
+# Entries kept per cache (exact, template, semantic); the oldest are evicted first
+MAX_CACHE_ENTRIES = 1000
+
+@dataclass(slots=True)
+class Task:
+    """A single step of a plan"""
+    id: int
+    name: str
+    description: str
+    duration: str
+    dependencies: str
+    priority: str
+    deliverables: str
+    risks: str
+    status: str = "pending"
+
+class _PartialTaskParser:
+    """Pulls complete task objects out of a partially streamed JSON array"""
+    
+    def __init__(self):
+        self.buffer = ""
+        self.tasks = []
+        self._pos = 0
+        self._open = []
+        self._in_string = False
+        self._escaped = False
+        self._task_depth = None
+    
+    def feed(self, text: str) -> bool:
+        """Append streamed text; return True if new tasks were completed"""
+        self.buffer += text
+        found = False
+        
+        for i in range(self._pos, len(self.buffer)):
+            ch = self.buffer[i]
+            
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "[{":
+                # Tasks are the objects directly inside the first array
+                if ch == "[" and self._task_depth is None:
+                    self._task_depth = len(self._open) + 1
+                self._open.append(i)
+            elif ch in "]}" and self._open:
+                start = self._open.pop()
+                if ch == "}" and len(self._open) == self._task_depth:
+                    try:
+                        task = orjson.loads(self.buffer[start:i + 1])
+                    except ValueError:
+                        continue
+                    if isinstance(task, dict):
+                        self.tasks.append(task)
+                        found = True
+        
+        self._pos = len(self.buffer)
+        return found
 
 class SmartTaskPlanner:
     """AI-powered task planner with LLM reasoning"""
     
+    # Constant system prompt keeps the request prefix stable for OpenAI's prompt cache
+    _SYSTEM_PROMPT = "You are an expert project manager. Create comprehensive task breakdowns with dependencies, timelines, and risk assessment."
+    _USER_TMPL = "goal:{goal}\ntimeframe:{timeframe}\n{ctx}return 6-12 tasks as JSON"
+    _BATCH_TMPL = "{ctx}for each goal return 6-12 tasks as JSON plans keyed by goal_id\n{goals}"
+    
+    # Temperature 0 keeps responses deterministic, so they are safe to cache
+    _TEMPERATURE = 0
+    
     def __init__(self):
-        self.client = client
-        self.database = []
-        self.task_history = []
+        self._client = None
+        self._client_ready = False
+        self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        self._requests_remaining: Dict[str, int] = {}
+        self._requests_reset_at: Dict[str, float] = {}
+        
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(PLANS_DB, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS plans(id TEXT PRIMARY KEY, goal TEXT, created_at TEXT, json BLOB)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_goal ON plans(goal)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_created_at ON plans(created_at)")
+        self._conn.commit()
+        
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        self._cache_lock = threading.Lock()
+        self._response_store = shelve.open(os.path.join(CACHE_DIR, "responses"))
+        for key in list(self._response_store)[MAX_CACHE_ENTRIES:]:
+            del self._response_store[key]
+        self._response_cache: Dict[str, List[Task]] = {
+            key: [Task(**task) for task in tasks] for key, tasks in self._response_store.items()
+        }
+        self._template_cache: Dict[Tuple[str, str, str], Tuple[List[Task], int]] = {}
+        self._load_embeddings()
+        atexit.register(self._save_embeddings)
     
-    def generate_plan(self, goal: str, timeframe: str = "2 weeks", 
-                     additional_context: str = "") -> Dict:
+    @property
+    def client(self):
+        """OpenAI client, created on first use (None without an API key)"""
+        if not self._client_ready:
+            if OPENAI_API_KEY:
+                import httpx
+                from openai import AsyncOpenAI
+                
+                # One pooled HTTP/2 connection set shared by every request (keep-alive, multiplexed streams)
+                http_client = httpx.AsyncClient(
+                    http2=True,
+                    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=300)
+                )
+                # Retries are handled by tenacity in _call_api / _open_stream. The SDK's 600s read timeout is kept
+                # explicitly: non-streamed batch completions can take well over a minute.
+                self._client = AsyncOpenAI(
+                    api_key=OPENAI_API_KEY,
+                    max_retries=0,
+                    timeout=httpx.Timeout(600.0, connect=5.0),
+                    http_client=http_client
+                )
+            self._client_ready = True
+        return self._client
+    
+    async def generate_plan(self, goal: str, timeframe: str = "2 weeks", 
+                           additional_context: str = "") -> Dict:
         """Generate task plan using LLM reasoning"""
         
+        async for plan, done in self.generate_plan_stream(goal, timeframe, additional_context):
+            if done:
+                return plan
+    
+    async def generate_plan_stream(self, goal: str, timeframe: str = "2 weeks",
+                                   additional_context: str = ""):
+        """Yield (plan, done) pairs: partial plans while the LLM streams, then the final plan"""
+        
         if not self.client:
-            return self._generate_fallback_plan(goal, timeframe)
+            yield self._generate_fallback_plan(goal, timeframe), True
+            return
+        
+        plan_id = secrets.token_hex(4)
         
         try:
-            tasks = self._generate_tasks_with_llm(goal, timeframe, additional_context)
-            
-            plan = {
-                "id": str(uuid.uuid4())[:8],
-                "goal": goal,
-                "timeframe": timeframe,
-                "tasks": tasks,
-                "created_at": datetime.now().isoformat(),
-                "total_tasks": len(tasks),
-                "estimated_total_time": self._calculate_total_time(tasks)
-            }
-            
-            self.database.append(plan)
-            self.task_history.append(plan)
-            
-            return plan
+            async for tasks, done in self._generate_tasks_with_llm(goal, timeframe, additional_context):
+                plan = self._build_plan(plan_id, goal, timeframe, tasks)
+                
+                if done:
+                    await asyncio.to_thread(self._save_plan, plan)
+                
+                yield plan, done
             
         except Exception as e:
             print(f"Error: {str(e)}")
-            return self._generate_fallback_plan(goal, timeframe)
+            yield self._generate_fallback_plan(goal, timeframe), True
     
-    def _generate_tasks_with_llm(self, goal: str, timeframe: str, context: str) -> List[Dict]:
-        """Core LLM reasoning"""
+    async def generate_plans_batch(self, goals: List[str], timeframe: str = "2 weeks",
+                                   additional_context: str = "") -> List[Dict]:
+        """Generate plans for several goals, packing up to BATCH_SIZE goals per LLM call"""
         
-        system_prompt = """You are an expert project manager. Create comprehensive task breakdowns with dependencies, timelines, and risk assessment."""
+        if not self.client:
+            return [self._generate_fallback_plan(goal, timeframe) for goal in goals]
         
-        user_prompt = f"""Break down this goal into 6-12 actionable tasks:
-
-GOAL: {goal}
-TIMEFRAME: {timeframe}
-{f"CONTEXT: {context}" if context else ""}
-
-For each task provide:
-- name: Clear task name
-- description: What needs to be done
-- duration: Time estimate
-- dependencies: Prerequisites (or "None")
-- priority: High/Medium/Low
-- deliverables: Expected outputs
-- risks: Potential issues
-
-Return as JSON array."""
-
-        response = self.client.chat.completions.create(
-            model="gpt-4o-mini",
+        batches = [goals[i:i + BATCH_SIZE] for i in range(0, len(goals), BATCH_SIZE)]
+        results = await asyncio.gather(
+            *(self._generate_batch_with_llm(batch, timeframe, additional_context) for batch in batches),
+            return_exceptions=True
+        )
+        
+        plans = []
+        for batch, result in zip(batches, results):
+            if isinstance(result, Exception):
+                print(f"Error: {str(result)}")
+                result = [None] * len(batch)
+            
+            for goal, tasks in zip(batch, result):
+                if tasks is None:
+                    plans.append(self._generate_fallback_plan(goal, timeframe))
+                    continue
+                
+                plan = self._build_plan(secrets.token_hex(4), goal, timeframe, tasks)
+                await asyncio.to_thread(self._save_plan, plan)
+                plans.append(plan)
+        
+        return plans
+    
+    def _build_plan(self, plan_id: str, goal: str, timeframe: str, tasks: List[Task]) -> Dict:
+        """Assemble a plan around its task list"""
+        return {
+            "id": plan_id,
+            "goal": goal,
+            "timeframe": timeframe,
+            "tasks": tasks,
+            "created_at": datetime.now(),
+            "total_tasks": len(tasks),
+            "estimated_total_time": self._calculate_total_time(tasks)
+        }
+    
+    def _save_plan(self, plan: Dict):
+        """Persist a generated plan"""
+        with self._db_lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO plans(id, goal, created_at, json) VALUES (?, ?, ?, ?)",
+                (plan["id"], plan["goal"], plan["created_at"].isoformat(), orjson.dumps(plan))
+            )
+            self._conn.commit()
+    
+    def get_plan(self, plan_id: str) -> Optional[Dict]:
+        """Look up a stored plan by id"""
+        with self._db_lock:
+            row = self._conn.execute("SELECT json FROM plans WHERE id = ?", (plan_id,)).fetchone()
+        return self._load_plan(row[0]) if row else None
+    
+    def find_plans(self, goal: str) -> List[Dict]:
+        """Stored plans for a goal, newest first"""
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT json FROM plans WHERE goal = ? ORDER BY created_at DESC", (goal,)
+            ).fetchall()
+        return [self._load_plan(row[0]) for row in rows]
+    
+    def _load_plan(self, blob: bytes) -> Dict:
+        """Rehydrate a stored plan into the shape generate_plan returns"""
+        plan = orjson.loads(blob)
+        plan["created_at"] = datetime.fromisoformat(plan["created_at"])
+        plan["tasks"] = [Task(**task) for task in plan["tasks"]]
+        return plan
+    
+    def count_plans(self) -> int:
+        """Number of stored plans"""
+        with self._db_lock:
+            return self._conn.execute("SELECT COUNT(*) FROM plans").fetchone()[0]
+    
+    def export_plan_json(self, plan_id: str) -> str:
+        """Stored plan as indented JSON (empty string if unknown)"""
+        plan = self.get_plan(plan_id)
+        return orjson.dumps(plan, option=orjson.OPT_INDENT_2).decode() if plan else ""
+    
+    def _cache_key(self, goal: str, timeframe: str, context: str) -> Tuple[str, str]:
+        """User prompt for a goal and its exact-match cache key"""
+        user_prompt = self._USER_TMPL.format(
+            goal=goal,
+            timeframe=timeframe,
+            ctx=f"ctx:{context}\n" if context else ""
+        )
+        
+        key = hashlib.blake2b(
+            f"{OPENAI_MODEL}|{self._TEMPERATURE}|{self._SYSTEM_PROMPT}|{user_prompt}".encode(),
+            digest_size=16
+        ).hexdigest()
+        
+        return user_prompt, key
+    
+    def _template_key(self, goal: str, timeframe: str, context: str) -> Tuple[Tuple[str, str, str], List[str]]:
+        """Template cache key for a goal and its slot values"""
+        template, slots = self._templatize(goal)
+        return (template, self._timeframe_bucket(timeframe), context.strip().lower()), slots
+    
+    async def _generate_tasks_with_llm(self, goal: str, timeframe: str, context: str):
+        """Core LLM reasoning, streamed as (tasks, done) pairs"""
+        
+        user_prompt, key = self._cache_key(goal, timeframe, context)
+        
+        if key in self._response_cache:
+            yield copy.deepcopy(self._response_cache[key]), True
+            return
+        
+        template_key, slots = self._template_key(goal, timeframe, context)
+        
+        if template_key in self._template_cache:
+            yield self._render_template(self._template_cache[template_key], slots), True
+            return
+        
+        # The semantic cache is best-effort: if embeddings fail, go straight to the LLM
+        try:
+            embedding = await self._embed(goal, timeframe, context)
+            cached = self._lookup_semantic(embedding)
+        except Exception as e:
+            print(f"Semantic cache unavailable: {str(e)}")
+            embedding = cached = None
+        
+        if cached is not None:
+            yield cached, True
+            return
+        
+        parser = _PartialTaskParser()
+        
+        finish_reason = None
+        
+        async with self._stream_api(
+            self.client.chat.completions,
+            model=OPENAI_MODEL,
             messages=[
-                {"role": "system", "content": system_prompt},
+                {"role": "system", "content": self._SYSTEM_PROMPT},
                 {"role": "user", "content": user_prompt}
             ],
-            temperature=0.7,
-            max_tokens=3000
+            temperature=self._TEMPERATURE,
+            max_tokens=MAX_COMPLETION_TOKENS,
+            response_format={"type": "json_schema", "json_schema": TASKS_SCHEMA}
+        ) as stream:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                finish_reason = chunk.choices[0].finish_reason or finish_reason
+                delta = chunk.choices[0].delta.content
+                if delta and parser.feed(delta):
+                    yield self._validate_tasks(parser.tasks), False
+        
+        try:
+            tasks = orjson.loads(parser.buffer)["tasks"] if finish_reason != "length" else None
+        except (ValueError, KeyError):
+            tasks = None
+        
+        # Cut-off output: keep the tasks that streamed in completely, but don't cache them
+        if tasks is None:
+            if not parser.tasks:
+                raise ValueError("LLM response ended before the first task")
+            yield self._validate_tasks(parser.tasks), True
+            return
+        
+        validated = self._validate_tasks(tasks)
+        await asyncio.to_thread(self._store_response, key, validated)
+        self._cache_put(self._template_cache, template_key, (self._make_skeleton(validated, slots), len(slots)))
+        if embedding is not None:
+            self._store_semantic(embedding, {
+                "goal": goal,
+                "timeframe": timeframe,
+                "context": context,
+                "tasks": validated
+            })
+        
+        yield copy.deepcopy(validated), True
+    
+    async def _generate_batch_with_llm(self, goals: List[str], timeframe: str,
+                                       context: str) -> List[Optional[List[Task]]]:
+        """Tasks for each goal from one completion; None where the model skipped a goal"""
+        
+        keys = [self._cache_key(goal, timeframe, context)[1] for goal in goals]
+        results = [copy.deepcopy(self._response_cache.get(key)) for key in keys]
+        pending = [i for i, tasks in enumerate(results) if tasks is None]
+        
+        if not pending:
+            return results
+        
+        user_prompt = self._BATCH_TMPL.format(
+            ctx=f"ctx:{context}\n" if context else "",
+            goals=orjson.dumps({
+                "goals": [{"id": i, "goal": goals[i], "timeframe": timeframe} for i in pending]
+            }).decode()
         )
         
-        result = response.choices[0].message.content
+        response = await self._call_api(
+            self.client.chat.completions,
+            model=OPENAI_MODEL,
+            messages=[
+                {"role": "system", "content": self._SYSTEM_PROMPT},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=self._TEMPERATURE,
+            max_tokens=MAX_COMPLETION_TOKENS * len(pending),
+            response_format={"type": "json_schema", "json_schema": BATCH_SCHEMA}
+        )
         
-        # Parse JSON
-        if "```json" in result:
-            result = result.split("```json")[1].split("```")[0].strip()
-        elif "```" in result:
-            result = result.split("```")[1].split("```")[0].strip()
+        by_goal = {
+            plan["goal_id"]: plan["tasks"]
+            for plan in orjson.loads(response.choices[0].message.content)["plans"]
+        }
         
-        tasks = json.loads(result)
+        # Register each plan as if it came from a single-goal request, which pre-warms the caches
+        for i in pending:
+            if not by_goal.get(i):
+                continue
+            
+            validated = self._validate_tasks(by_goal[i])
+            await asyncio.to_thread(self._store_response, keys[i], validated)
+            template_key, slots = self._template_key(goals[i], timeframe, context)
+            self._cache_put(self._template_cache, template_key, (self._make_skeleton(validated, slots), len(slots)))
+            results[i] = copy.deepcopy(validated)
         
-        if isinstance(tasks, dict) and "tasks" in tasks:
-            tasks = tasks["tasks"]
+        return results
+    
+    @_api_retry
+    async def _call_api(self, resource, **kwargs):
+        """Rate-limited OpenAI create() call on a client resource"""
+        async with self._semaphore:
+            return await self._create(resource, **kwargs)
+    
+    @contextlib.asynccontextmanager
+    async def _stream_api(self, resource, **kwargs):
+        """Streamed create() call that keeps its concurrency slot until the stream is consumed"""
+        stream = await self._open_stream(resource, **kwargs)
+        try:
+            yield stream
+        finally:
+            self._semaphore.release()
+    
+    @_api_retry
+    async def _open_stream(self, resource, **kwargs):
+        """Acquire a concurrency slot and open the stream; the caller releases the slot"""
+        await self._semaphore.acquire()
+        try:
+            return await self._create(resource, stream=True, **kwargs)
+        except BaseException:
+            self._semaphore.release()
+            raise
+    
+    async def _create(self, resource, **kwargs):
+        """Single create() call that honours and updates the tracked rate limit"""
+        model = kwargs["model"]
+        await self._wait_for_rate_limit(model)
+        raw = await resource.with_raw_response.create(**kwargs)
         
-        return self._validate_tasks(tasks)
+        self._update_rate_limit(model, raw.headers)
+        return raw.parse()
     
-    def _validate_tasks(self, tasks: List[Dict]) -> List[Dict]:
-        """Validate task structure"""
-        validated = []
-        
-        for i, task in enumerate(tasks, 1):
-            validated_task = {
-                "id": i,
-                "name": task.get("name", f"Task {i}"),
-                "description": task.get("description", "No description"),
-                "duration": task.get("duration", "1 day"),
-                "dependencies": task.get("dependencies", "None"),
-                "priority": task.get("priority", "Medium"),
-                "deliverables": task.get("deliverables", "Task completion"),
-                "risks": task.get("risks", "None identified"),
-                "status": "pending"
-            }
-            validated.append(validated_task)
+    async def _wait_for_rate_limit(self, model: str):
+        """Hold new requests once the API reports the model's request budget is spent"""
+        remaining = self._requests_remaining.get(model)
+        if remaining is not None and remaining <= 0:
+            delay = self._requests_reset_at[model] - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            del self._requests_remaining[model]
+        elif remaining is not None:
+            self._requests_remaining[model] = remaining - 1
+    
+    def _update_rate_limit(self, model: str, headers):
+        """Track the model's request budget from x-ratelimit-* response headers"""
+        remaining = headers.get("x-ratelimit-remaining-requests")
+        if remaining is None:
+            return
+        
+        reset = sum(
+            float(value) * _RESET_UNITS[unit]
+            for value, unit in _RESET_RE.findall(headers.get("x-ratelimit-reset-requests", ""))
+        )
+        self._requests_remaining[model] = int(remaining)
+        self._requests_reset_at[model] = time.monotonic() + reset
+    
+    def _store_response(self, key: str, tasks: List[Task]):
+        """Cache validated tasks in memory and on disk"""
+        with self._cache_lock:
+            evicted = self._cache_put(self._response_cache, key, tasks)
+            if evicted is not None and evicted in self._response_store:
+                del self._response_store[evicted]
+            self._response_store[key] = [asdict(task) for task in tasks]
+            self._response_store.sync()
+    
+    def _cache_put(self, cache: Dict, key, value):
+        """Insert into a bounded cache; return the evicted (oldest) key, if any"""
+        cache.pop(key, None)
+        cache[key] = value
+        if len(cache) > MAX_CACHE_ENTRIES:
+            oldest = next(iter(cache))
+            del cache[oldest]
+            return oldest
+        return None
+    
+    async def _embed(self, goal: str, timeframe: str, context: str) -> "np.ndarray":
+        """L2-normalized embedding of the request"""
+        import numpy as np
+        
+        text = f"{goal}\nTIMEFRAME: {timeframe}\n{context}".strip()
+        response = await self._call_api(self.client.embeddings, model=EMBEDDING_MODEL, input=text)
+        
+        vector = np.asarray(response.data[0].embedding, dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+    
+    def _lookup_semantic(self, embedding: "np.ndarray"):
+        """Tasks of the most similar cached request, if close enough"""
+        if not len(self._emb_plans):
+            return None
         
-        return validated
+        sims = self._emb_matrix[:len(self._emb_plans)] @ embedding
+        best = int(sims.argmax())
+        
+        if sims[best] > SEMANTIC_CACHE_THRESHOLD:
+            return copy.deepcopy(self._emb_plans[best]["tasks"])
+        return None
+    
+    def _store_semantic(self, embedding: "np.ndarray", entry: Dict):
+        """Add a request embedding and its plan to the semantic cache (ring buffer)"""
+        with self._cache_lock:
+            row = self._emb_next
+            self._emb_matrix[row] = embedding
+            if row < len(self._emb_plans):
+                self._emb_plans[row] = entry
+            else:
+                self._emb_plans.append(entry)
+            self._emb_next = (row + 1) % MAX_CACHE_ENTRIES
     
-    def _calculate_total_time(self, tasks: List[Dict]) -> str:
+    def _load_embeddings(self):
+        """Restore the semantic cache saved by a previous run"""
+        import numpy as np
+        
+        self._emb_matrix = np.zeros((MAX_CACHE_ENTRIES, EMBEDDING_DIM), dtype=np.float32)
+        self._emb_plans: List[Dict] = []
+        self._emb_next = 0
+        
+        matrix_path = os.path.join(CACHE_DIR, "embeddings.npy")
+        plans_path = os.path.join(CACHE_DIR, "embedding_plans.json")
+        
+        if os.path.exists(matrix_path) and os.path.exists(plans_path):
+            with open(plans_path, "rb") as f:
+                plans = orjson.loads(f.read())
+            matrix = np.load(matrix_path)
+            
+            if len(plans) == len(matrix):
+                # Saved oldest first, so keep the newest entries that fit
+                plans, matrix = plans[-MAX_CACHE_ENTRIES:], matrix[-MAX_CACHE_ENTRIES:]
+                for plan in plans:
+                    plan["tasks"] = [Task(**task) for task in plan["tasks"]]
+                self._emb_matrix[:len(matrix)] = matrix
+                self._emb_plans = plans
+                self._emb_next = len(plans) % MAX_CACHE_ENTRIES
+    
+    def _save_embeddings(self):
+        """Persist the semantic cache on shutdown"""
+        import numpy as np
+        
+        with self._cache_lock:
+            # Unroll the ring so entries are written oldest first
+            count = len(self._emb_plans)
+            start = self._emb_next if count == MAX_CACHE_ENTRIES else 0
+            matrix = np.roll(self._emb_matrix[:count], -start, axis=0)
+            plans = self._emb_plans[start:] + self._emb_plans[:start]
+            
+            np.save(os.path.join(CACHE_DIR, "embeddings.npy"), matrix)
+            with open(os.path.join(CACHE_DIR, "embedding_plans.json"), "wb") as f:
+                f.write(orjson.dumps(plans))
+    
+    def _templatize(self, goal: str) -> Tuple[str, List[str]]:
+        """Replace entity slots in a goal with <SLOT_i> placeholders"""
+        slots = []
+        
+        def to_placeholder(match):
+            value = next(group for group in match.groups() if group is not None)
+            if value not in slots:
+                slots.append(value)
+            return f"<SLOT_{slots.index(value)}>"
+        
+        template = _SLOT_RE.sub(to_placeholder, " ".join(goal.split()))
+        return template, slots
+    
+    def _timeframe_bucket(self, timeframe: str) -> str:
+        """Coarse timeframe bucket so templated plans keep a sensible scale"""
+        match = _TIMEFRAME_RE.search(timeframe)
+        if not match:
+            return timeframe.strip().lower()
+        
+        days = float(match.group(1)) * _TIMEFRAME_DAYS[match.group(2).lower()]
+        
+        if days < 7:
+            return "<1wk"
+        elif days <= 28:
+            return "1-4wk"
+        else:
+            return ">1mo"
+    
+    def _make_skeleton(self, tasks: List[Task], slots: List[str]) -> List[Task]:
+        """Turn slot values in task text into {SLOT_i} format fields"""
+        # Longest values first so "React Native" wins over "React"
+        ordered = sorted(enumerate(slots), key=lambda item: -len(item[1]))
+        skeleton = copy.deepcopy(tasks)
+        
+        for task in skeleton:
+            for field in _TEMPLATED_FIELDS:
+                text = str(getattr(task, field)).replace("{", "{{").replace("}", "}}")
+                for index, value in ordered:
+                    text = re.sub(rf"(?<!\w){re.escape(value)}(?!\w)", f"{{SLOT_{index}}}", text)
+                setattr(task, field, text)
+        
+        return skeleton
+    
+    def _render_template(self, entry: Tuple[List[Task], int], slots: List[str]) -> List[Task]:
+        """Fill a cached task skeleton with the slot values of a new goal"""
+        skeleton, slot_count = entry
+        values = {f"SLOT_{i}": slot for i, slot in enumerate(slots[:slot_count])}
+        tasks = copy.deepcopy(skeleton)
+        
+        for task in tasks:
+            for field in _TEMPLATED_FIELDS:
+                setattr(task, field, getattr(task, field).format_map(values))
+        
+        return tasks
+    
+    def _validate_tasks(self, tasks: List[Dict]) -> List[Task]:
+        """Validate task structure"""
+        return [
+            Task(**{**_TASK_DEFAULTS, **task, "id": i, "status": "pending", "name": task.get("name") or f"Task {i}"})
+            for i, task in enumerate(tasks, 1)
+        ]
+    
+    def _calculate_total_time(self, tasks: List[Task]) -> str:
         """Calculate total project time"""
         total_hours = 0
         
         for task in tasks:
-            duration = task.get("duration", "1 day").lower()
-            
-            if "hour" in duration:
-                hours = int(''.join(filter(str.isdigit, duration.split()[0])))
-                total_hours += hours
-            elif "day" in duration:
-                days = int(''.join(filter(str.isdigit, duration.split()[0])))
-                total_hours += days * 8
-            elif "week" in duration:
-                weeks = int(''.join(filter(str.isdigit, duration.split()[0])))
-                total_hours += weeks * 40
+            match = _DUR_RE.search(task.duration)
+            total_hours += float(match.group(1)) * _MULT[match.group(2)[:2].lower()] if match else 8
+        
+        total_hours = round(total_hours)
         
         if total_hours < 8:
             return f"{total_hours} hours"
@@ -157,123 +795,117 @@ Return as JSON array."""
     def _generate_fallback_plan(self, goal: str, timeframe: str) -> Dict:
         """Fallback when AI unavailable"""
         tasks = [
-            {
-                "id": 1,
-                "name": "Planning & Research",
-                "description": f"Research and plan: {goal}",
-                "duration": "2 days",
-                "dependencies": "None",
-                "priority": "High",
-                "deliverables": "Project plan",
-                "risks": "Insufficient info",
-                "status": "pending"
-            },
-            {
-                "id": 2,
-                "name": "Setup",
-                "description": "Environment and tools setup",
-                "duration": "1 day",
-                "dependencies": "Planning & Research",
-                "priority": "High",
-                "deliverables": "Ready environment",
-                "risks": "Technical issues",
-                "status": "pending"
-            },
-            {
-                "id": 3,
-                "name": "Implementation",
-                "description": "Core development work",
-                "duration": "1 week",
-                "dependencies": "Setup",
-                "priority": "High",
-                "deliverables": "Working prototype",
-                "risks": "Complexity",
-                "status": "pending"
-            }
+            Task(
+                id=1,
+                name="Planning & Research",
+                description=f"Research and plan: {goal}",
+                duration="2 days",
+                dependencies="None",
+                priority="High",
+                deliverables="Project plan",
+                risks="Insufficient info",
+                status="pending"
+            ),
+            Task(
+                id=2,
+                name="Setup",
+                description="Environment and tools setup",
+                duration="1 day",
+                dependencies="Planning & Research",
+                priority="High",
+                deliverables="Ready environment",
+                risks="Technical issues",
+                status="pending"
+            ),
+            Task(
+                id=3,
+                name="Implementation",
+                description="Core development work",
+                duration="1 week",
+                dependencies="Setup",
+                priority="High",
+                deliverables="Working prototype",
+                risks="Complexity",
+                status="pending"
+            )
         ]
         
         return {
-            "id": str(uuid.uuid4())[:8],
+            "id": secrets.token_hex(4),
             "goal": goal,
             "timeframe": timeframe,
             "tasks": tasks,
-            "created_at": datetime.now().isoformat(),
+            "created_at": datetime.now(),
             "total_tasks": len(tasks),
             "estimated_total_time": timeframe
         }
     
     def format_plan_output(self, plan: Dict) -> str:
         """Format for display"""
-        output = f"""# 🎯 Task Plan
-
-**ID**: {plan['id']}  
-**Goal**: {plan['goal']}  
-**Timeframe**: {plan['timeframe']}  
-**Tasks**: {plan['total_tasks']}  
-
----
+        return _PLAN_TPL.render(plan=plan, icons=_PRIORITY_ICON)
 
-"""
-        
-        for task in plan['tasks']:
-            priority_icon = {"High": "🔴", "Medium": "🟡", "Low": "🟢"}.get(task['priority'], "⚪")
-            
-            output += f"""## {task['id']}. {task['name']} {priority_icon}
+# Initialize on first use, so importing this module stays free of disk and cache I/O
+_planner: Optional[SmartTaskPlanner] = None
 
-{task['description']}
-
-⏱️ **Duration**: {task['duration']}  
-🔗 **Dependencies**: {task['dependencies']}  
-📦 **Deliverables**: {task['deliverables']}  
-⚠️ **Risks**: {task['risks']}
-
----
-
-"""
-        
-        return output
-
-# Initialize
-planner = SmartTaskPlanner()
+def get_planner() -> SmartTaskPlanner:
+    """Shared planner instance"""
+    global _planner
+    if _planner is None:
+        _planner = SmartTaskPlanner()
+    return _planner
 
 # Gradio functions
-def generate_task_plan(goal, timeframe, context):
+async def generate_task_plan(goal, timeframe, context):
     if not goal.strip():
-        return "⚠️ Please enter a goal", "", ""
-    
-    plan = planner.generate_plan(goal, timeframe, context)
-    formatted = planner.format_plan_output(plan)
-    json_export = json.dumps(plan, indent=2)
+        yield "⚠️ Please enter a goal", "", ""
+        return
     
-    stats = f"**Plans Generated**: {len(planner.database)}"
-    
-    return formatted, json_export, stats
+    planner = get_planner()
+    async for plan, done in planner.generate_plan_stream(goal, timeframe, context):
+        formatted = planner.format_plan_output(plan)
+        
+        if not done:
+            yield formatted, "", ""
+            continue
+        
+        json_export = orjson.dumps(plan, option=orjson.OPT_INDENT_2).decode()
+        stats = f"**Plans Generated**: {await asyncio.to_thread(planner.count_plans)}"
+        
+        yield formatted, json_export, stats
 
-# Create UI
-with gr.Blocks(theme=gr.themes.Soft()) as app:
-    gr.Markdown("# 🤖 AI Smart Task Planner")
-    
-    with gr.Row():
-        goal_input = gr.Textbox(label="Goal", lines=3)
-        timeframe_input = gr.Textbox(label="Timeframe", value="2 weeks")
-    
-    context_input = gr.Textbox(label="Context (Optional)", lines=2)
-    generate_btn = gr.Button("Generate Plan", variant="primary")
+def build_ui():
+    """Create the Gradio UI (gradio is imported here to keep module import light)"""
+    import gradio as gr
     
-    with gr.Tabs():
-        with gr.Tab("Plan"):
-            plan_output = gr.Markdown()
-        with gr.Tab("JSON"):
-            json_output = gr.Code(language="json")
-        with gr.Tab("Stats"):
-            stats_output = gr.Markdown()
+    with gr.Blocks(theme=gr.themes.Soft()) as app:
+        gr.Markdown("# 🤖 AI Smart Task Planner")
+        
+        with gr.Row():
+            goal_input = gr.Textbox(label="Goal", lines=3)
+            timeframe_input = gr.Textbox(label="Timeframe", value="2 weeks")
+        
+        context_input = gr.Textbox(label="Context (Optional)", lines=2)
+        generate_btn = gr.Button("Generate Plan", variant="primary")
+        
+        with gr.Tabs():
+            with gr.Tab("Plan"):
+                plan_output = gr.Markdown()
+            with gr.Tab("JSON"):
+                json_output = gr.Code(language="json")
+            with gr.Tab("Stats"):
+                stats_output = gr.Markdown()
+        
+        generate_btn.click(
+            fn=generate_task_plan,
+            inputs=[goal_input, timeframe_input, context_input],
+            outputs=[plan_output, json_output, stats_output],
+            # Gradio defaults to one run at a time per event; let the async handler serve users concurrently
+            concurrency_limit=MAX_CONCURRENT_REQUESTS
+        )
     
-    generate_btn.click(
-        fn=generate_task_plan,
-        inputs=[goal_input, timeframe_input, context_input],
-        outputs=[plan_output, json_output, stats_output]
-    )
+    return app
 
 if __name__ == "__main__":
     print("🚀 Starting AI Smart Task Planner...")
-    app.launch(share=True)
\ No newline at end of file
+    get_planner()
+    build_ui().launch(share=True)